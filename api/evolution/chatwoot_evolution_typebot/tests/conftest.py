@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# cli.py lê a configuração na importação: dados num diretório temporário e API inexistente
+os.environ["EVOLUTION_DATA_DIR"] = tempfile.mkdtemp(prefix="evolution-tests-")
+os.environ.setdefault("EVOLUTION_BASE_URL", "http://127.0.0.1:9")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,44 @@
+import json
+
+import cli
+
+
+def run_batch(tmp_path, lines):
+    source = tmp_path / "ops.jsonl"
+    source.write_text("".join(json.dumps(line) + "\n" for line in lines), encoding="utf-8")
+    results = tmp_path / "results.jsonl"
+    cli.batch_run(str(source), results=str(results), workers=2, stop_on_error=True)
+    return [json.loads(line) for line in results.read_text(encoding="utf-8").splitlines()]
+
+
+def test_typer_exit_is_recorded_as_error(tmp_path, capsys):
+    db = str(tmp_path / "results.db")
+    records = run_batch(tmp_path, [
+        {"command": "results status", "args": {"db": db}, "key": "g"},
+        {"command": "results poll", "args": ["nao-existe", "--db", db], "key": "g"},
+        {"command": "results status", "args": {"db": db}, "key": "g"},
+    ])
+    by_line = {record["line"]: record for record in records}
+    assert by_line[1]["status"] == "ok"
+    assert by_line[2]["status"] == "error"
+    assert by_line[2]["error"] == "exit 1"
+    assert "Enquete não encontrada" in by_line[2]["output"]
+    assert by_line[3]["status"] == "skipped"
+    # A saída dos comandos do lote vai para o arquivo de resultados, não para o terminal
+    assert "Enquete não encontrada" not in capsys.readouterr().out
+
+
+def test_bulk_workers_inherit_quiet_output_and_capture(capsys):
+    def send(job):
+        cli.console.print(f"job {job}")
+        cli.client.captured().append({"job": job})
+        return job
+
+    lines = []
+    with cli.client.capture() as captured, cli.quiet_output(lines):
+        sent, failed = cli.run_bulk(range(4), send, 2)
+    assert (sent, failed) == (4, 0)
+    assert sorted(item["job"] for item in captured) == [0, 1, 2, 3]
+    assert sorted(line.strip() for line in lines if line.strip()) == ["job 0", "job 1", "job 2", "job 3"]
+    assert capsys.readouterr().out == ""
+    assert cli.output_context() == (False, None, (None, None))
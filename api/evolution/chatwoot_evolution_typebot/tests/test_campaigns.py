@@ -0,0 +1,126 @@
+import json
+import threading
+from collections import Counter
+
+import pytest
+import requests
+
+import cli
+
+
+NUMBERS = [f"55119{i:08d}" for i in range(5000)]
+
+
+def test_hash_ring_is_stable():
+    first = cli.HashRing(["a", "b", "c"])
+    second = cli.HashRing(["c", "a", "b"])
+    assert [first.get(n) for n in NUMBERS[:200]] == [second.get(n) for n in NUMBERS[:200]]
+
+
+def test_hash_ring_spreads_keys():
+    ring = cli.HashRing(["a", "b", "c", "d"])
+    counts = Counter(ring.get(n) for n in NUMBERS)
+    assert set(counts) == {"a", "b", "c", "d"}
+    assert min(counts.values()) > len(NUMBERS) / 4 * 0.6
+
+
+def test_hash_ring_moves_only_keys_of_new_node():
+    before = cli.HashRing(["a", "b", "c"])
+    after = cli.HashRing(["a", "b", "c", "d"])
+    moved = [n for n in NUMBERS if before.get(n) != after.get(n)]
+    # Só o novo nó recebe chaves, e em torno de 1/4 delas
+    assert all(after.get(n) == "d" for n in moved)
+    assert 0.1 < len(moved) / len(NUMBERS) < 0.4
+
+
+@pytest.fixture
+def store(tmp_path):
+    return cli.open_campaign_store(str(tmp_path / "campaigns.db"))
+
+
+def create(store, name="promo"):
+    rows = [("a:0", "a", n, {"number": n, "text": "oi"}) for n in NUMBERS[:3]]
+    return store.create(name, "sendText", rows)
+
+
+def test_campaign_store_uses_rollback_journal(store):
+    assert store.db.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+
+
+def test_takeover_marks_in_flight_rows_unknown(store):
+    create(store)
+    assert store.claim_shard("promo", "w1", lease=-1) == ("a:0", "a")
+    assert len(store.claim_rows("promo", "a:0", "w1", 2)) == 0
+    # Lease expirado: outro worker reassume e não reenvia o que estava saindo
+    assert store.claim_shard("promo", "w2", lease=30) == ("a:0", "a")
+    rows = store.claim_rows("promo", "a:0", "w2", 2)
+    assert len(rows) == 2
+    store.finish_rows("w1", [(rows[0][0], "sent", None)])
+    store.finish_rows("w2", [(row_id, "sent", None) for row_id, _, _ in rows])
+    counts = store.report("promo")[0][5]
+    assert counts == {"sent": 2, "pending": 1}
+
+
+class RecordingSession:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, **kwargs):
+        with self._lock:
+            self.calls.append(kwargs)
+        response = requests.Response()
+        response.status_code = 201
+        response._content = json.dumps({"key": {"id": "X"}}).encode()
+        response.headers["Content-Type"] = "application/json"
+        return response
+
+
+def test_work_scopes_bulk_priority(store, monkeypatch):
+    recording = RecordingSession()
+    monkeypatch.setattr(cli.client, "session", recording)
+    monkeypatch.setattr(cli.client, "priority", None)
+    monkeypatch.setattr(cli.client, "monitor", None)
+    create(store)
+    cli.campaign_work("promo", lease=30.0, batch=2, workers=2, parallel=2, db=store.path)
+    assert len(recording.calls) == 3
+    assert {call["headers"].get("X-Priority") for call in recording.calls} == {"bulk"}
+    assert cli.client.priority is None
+    cli.client.post("/message/sendText/a", json={"number": "1"})
+    assert recording.calls[-1]["headers"].get("X-Priority") is None
+
+
+def test_store_spec_selects_backend(tmp_path, monkeypatch):
+    path = tmp_path / "c.db"
+    assert isinstance(cli.open_campaign_store(str(path)), cli.SqliteCampaignStore)
+    assert cli.open_campaign_store(f"sqlite://{path}").path == str(path)
+    with pytest.raises(cli.typer.BadParameter):
+        cli.open_campaign_store("postgresql://db/campanhas")
+
+    class SharedStore(cli.CampaignStore):
+        def __init__(self, target):
+            self.target = target
+
+    monkeypatch.setitem(cli.CAMPAIGN_BACKENDS, "postgresql", SharedStore)
+    assert cli.open_campaign_store("postgresql://db/campanhas").target == "db/campanhas"
+
+
+def test_work_runs_against_any_backend(store, monkeypatch):
+    """work_shard e o comando só falam com o contrato de CampaignStore."""
+    calls = []
+
+    class Proxy(cli.CampaignStore):
+        def __getattribute__(self, attr):
+            if attr in ("endpoint", "claim_shard", "renew", "claim_rows", "finish_rows", "release_shard", "close"):
+                calls.append(attr)
+                return getattr(store, attr)
+            return super().__getattribute__(attr)
+
+    recording = RecordingSession()
+    monkeypatch.setattr(cli.client, "session", recording)
+    monkeypatch.setattr(cli.client, "monitor", None)
+    monkeypatch.setitem(cli.CAMPAIGN_BACKENDS, "proxy", lambda target: Proxy())
+    create(store)
+    cli.campaign_work("promo", lease=30.0, batch=10, workers=1, parallel=1, db="proxy://")
+    assert len(recording.calls) == 3
+    assert {"endpoint", "claim_shard", "claim_rows", "finish_rows", "release_shard"} <= set(calls)
@@ -0,0 +1,110 @@
+import pytest
+import requests
+
+import cli
+
+
+class FakeSession:
+    """Substitui requests.Session: devolve respostas prontas ou levanta exceções, em ordem."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    def request(self, **kwargs):
+        self.calls.append(kwargs)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def make_response(status, body=b"{}", headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response._content_consumed = True
+    response.headers.update(headers or {})
+    return response
+
+
+@pytest.fixture
+def api(monkeypatch):
+    client = cli.APIClient()
+    monkeypatch.setattr(cli.time, "sleep", lambda seconds: None)
+    return client
+
+
+def test_retry_after_is_capped(api):
+    assert api._retry_delay(1, "5") == 5.0
+    assert api._retry_delay(1, "86400") == api.MAX_RETRY_AFTER
+
+
+def test_throttled_request_is_retried(api):
+    api.session = FakeSession(make_response(429, headers={"Retry-After": "1"}), make_response(200, b'{"ok": true}'))
+    assert api.post("/message/sendText/a", json={"number": "1"}) == {"ok": True}
+    assert len(api.session.calls) == 2
+    assert api.limiters["a"].counts == {"ok": 1, "throttled": 1, "timeout": 0, "error": 0}
+
+
+@pytest.mark.parametrize("error", [requests.exceptions.InvalidURL("bad url"), requests.exceptions.TooManyRedirects("loop")])
+def test_other_request_errors_are_reported(api, capsys, error):
+    api.session = FakeSession(error)
+    with pytest.raises(type(error)):
+        api.get("/instance/fetchInstances")
+    assert "Request failed" in capsys.readouterr().out
+
+
+def test_limiter_halves_on_throttle_and_grows_when_busy(monkeypatch):
+    monkeypatch.setattr(cli.config, "LATENCY_TARGET_MS", 10_000.0)
+    limiter = cli.AdaptiveLimiter("a", initial=8, maximum=16)
+    limiter.acquire()
+    limiter.release(10, "throttled")
+    assert limiter.limit == 4
+    for _ in range(8):
+        for _ in range(4):
+            limiter.acquire()
+        for _ in range(4):
+            limiter.release(10, "ok")
+    assert 4 < limiter.limit <= 16
+    assert limiter.inflight == 0
+
+
+def test_limiter_respects_minimum():
+    limiter = cli.AdaptiveLimiter("a", initial=1, minimum=1)
+    limiter.acquire()
+    limiter.release(10, "timeout")
+    assert limiter.limit == 1
+
+
+def test_dry_run_fakes_writes_but_sends_lookups(api):
+    api.dry_run = True
+    api.session = FakeSession(make_response(200, b'[{"id": "1"}]'), make_response(200, b'[{"exists": true}]'))
+    assert api.post("/message/sendText/a", json={"number": "1"}) == {"dryRun": True}
+    assert api.delete("/instance/delete/a") == {"dryRun": True}
+    assert list(api.stream_list("POST", "/chat/findChats/a")) == [{"id": "1"}]
+    assert api.post("/chat/whatsappNumbers/a", json={"numbers": ["1"]}) == [{"exists": True}]
+    assert [call["url"].rsplit("/", 2)[-2] for call in api.session.calls] == ["findChats", "whatsappNumbers"]
+
+
+def test_connection_gate_is_opt_in():
+    assert cli.config.CONNECTION_GATE is False
+
+
+def test_monitor_reuses_cached_connection_state(monkeypatch):
+    open_state = b'{"instance": {"state": "open"}}'
+    session = FakeSession(make_response(200, open_state), *(make_response(200, b"{}") for _ in range(3)))
+    monkeypatch.setattr(cli.client, "session", session)
+    monkeypatch.setattr(cli.client, "monitor", cli.ConnectionMonitor(refresh=60))
+    for number in "123":
+        cli.client.post("/message/sendText/a", json={"number": number})
+    urls = [call["url"] for call in session.calls]
+    assert [url.endswith("/instance/connectionState/a") for url in urls] == [True, False, False, False]
+
+
+def test_monitor_only_gates_message_endpoints(monkeypatch):
+    session = FakeSession(make_response(200, b"{}"))
+    monkeypatch.setattr(cli.client, "session", session)
+    monkeypatch.setattr(cli.client, "monitor", cli.ConnectionMonitor(refresh=60))
+    cli.client.post("/settings/set/a", json={"rejectCall": True})
+    assert [call["url"] for call in session.calls] == [f"{cli.client.base_url}/settings/set/a"]
@@ -0,0 +1,69 @@
+import threading
+import time
+
+import cli
+
+
+class Flushes:
+    def __init__(self):
+        self.batches = []
+        self.event = threading.Event()
+
+    def __call__(self, key, bodies):
+        self.batches.append((key, [body["id"] for body in bodies], time.monotonic()))
+        self.event.set()
+
+
+def test_burst_is_flushed_once_after_the_window():
+    flushes = Flushes()
+    coalescer = cli.MessageCoalescer(flushes, window=0.1, max_delay=5)
+    started = time.monotonic()
+    for i in range(3):
+        coalescer.add("conversa", {"id": i})
+        time.sleep(0.03)
+    assert flushes.event.wait(2)
+    coalescer.close()
+    assert [batch[:2] for batch in flushes.batches] == [("conversa", [0, 1, 2])]
+    assert flushes.batches[0][2] - started >= 0.15
+
+
+def test_max_delay_caps_a_continuous_stream():
+    flushes = Flushes()
+    coalescer = cli.MessageCoalescer(flushes, window=0.1, max_delay=0.25)
+    started = time.monotonic()
+    i = 0
+    while not flushes.event.is_set() and time.monotonic() - started < 2:
+        coalescer.add("conversa", {"id": i})
+        i += 1
+        time.sleep(0.02)
+    coalescer.close()
+    assert flushes.batches[0][2] - started < 0.6
+    ids = [body_id for _, batch, _ in flushes.batches for body_id in batch]
+    assert ids == list(range(i))
+
+
+def test_max_messages_and_take_and_close():
+    flushes = Flushes()
+    coalescer = cli.MessageCoalescer(flushes, window=10, max_delay=10, max_messages=2)
+    coalescer.add("a", {"id": 1})
+    coalescer.add("a", {"id": 2})
+    assert flushes.batches[0][:2] == ("a", [1, 2])
+    coalescer.add("b", {"id": 3})
+    assert [body["id"] for body in coalescer.take("b")] == [3]
+    coalescer.add("c", {"id": 4})
+    coalescer.close()
+    assert [batch[:2] for batch in flushes.batches] == [("a", [1, 2]), ("c", [4])]
+
+
+def test_coalesce_messages_joins_text_and_attachments():
+    bodies = [
+        {"id": 1, "content": "oi", "attachments": [{"id": "x"}]},
+        {"id": 2, "content": None},
+        {"id": 3, "content": "tudo bem?", "conversation": {"id": 9}},
+    ]
+    combined = cli.coalesce_messages(bodies)
+    assert combined["content"] == "oi\ntudo bem?"
+    assert combined["attachments"] == [{"id": "x"}]
+    assert combined["coalesced_message_ids"] == [1, 2, 3]
+    assert combined["conversation"] == {"id": 9}
+    assert cli.coalesce_messages(bodies[:1]) is bodies[0]
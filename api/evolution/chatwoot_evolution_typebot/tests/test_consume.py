@@ -0,0 +1,203 @@
+import json
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+from unittest import mock
+
+import pytest
+
+import cli
+
+
+class AMQPError(Exception):
+    pass
+
+
+class FakeChannel:
+    def __init__(self, connection):
+        self.connection = connection
+        self.consumers = {}
+        self.acks = []
+        self.nacks = []
+
+    def basic_qos(self, prefetch_count):
+        pass
+
+    def queue_declare(self, queue, durable=False, passive=False):
+        return types.SimpleNamespace(method=types.SimpleNamespace(message_count=0))
+
+    def queue_bind(self, queue, exchange, routing_key):
+        pass
+
+    def basic_consume(self, queue, on_message_callback):
+        self.consumers[queue] = on_message_callback
+        return queue
+
+    def basic_cancel(self, consumer_tag):
+        self.consumers.pop(consumer_tag, None)
+
+    def basic_ack(self, tag, multiple=False):
+        self.acks.append(tag)
+
+    def basic_nack(self, tag, multiple=False, requeue=False):
+        self.nacks.append(tag)
+
+    def settled(self):
+        return max(self.acks, default=0) >= self.connection.tag or self.connection.tag in self.nacks
+
+
+class FakeConnection:
+    """Entrega um corpo por chamada de process_data_events; com drop, cai depois de tudo
+    confirmado (ou logo após a última entrega, com drop="early")."""
+
+    scripts = []
+    opened = []
+
+    def __init__(self, parameters):
+        bodies, self.drop = FakeConnection.scripts.pop(0)
+        self.bodies = list(bodies)
+        self.tag = 0
+        self.is_open = True
+        self._channel = FakeChannel(self)
+        FakeConnection.opened.append(self)
+
+    def channel(self):
+        return self._channel
+
+    def process_data_events(self, time_limit=0):
+        if self.bodies and self._channel.consumers:
+            self.tag += 1
+            callback = next(iter(self._channel.consumers.values()))
+            callback(self._channel, types.SimpleNamespace(delivery_tag=self.tag), None, json.dumps(self.bodies.pop(0)).encode())
+        elif self.drop == "early" or (self.drop and self._channel.settled()):
+            self.is_open = False
+            raise AMQPError("conexão perdida")
+
+    def close(self):
+        self.is_open = False
+
+
+class FailingHandler:
+    def __init__(self, argument):
+        pass
+
+    def handle(self, event):
+        if event["data"] == "falha":
+            raise ValueError("handler falhou")
+
+    def close(self):
+        pass
+
+
+class SlowHandler:
+    """Segura o evento cujo `data` tem uma trava em `gates` até ela ser liberada."""
+
+    gates = {}
+
+    def __init__(self, argument):
+        pass
+
+    def handle(self, event):
+        gate = self.gates.get(event["data"])
+        if gate is not None:
+            gate.wait(10)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pika(monkeypatch):
+    module = types.SimpleNamespace(
+        BlockingConnection=FakeConnection,
+        URLParameters=lambda uri: uri,
+        exceptions=types.SimpleNamespace(AMQPError=AMQPError),
+    )
+    monkeypatch.setitem(sys.modules, "pika", module)
+    monkeypatch.setitem(cli.EVENT_HANDLERS, "falha", FailingHandler)
+    monkeypatch.setitem(cli.EVENT_HANDLERS, "lento", SlowHandler)
+    FakeConnection.opened = []
+    return module
+
+
+def event(name, data="ok"):
+    return {"event": name, "instance": "a", "data": data}
+
+
+def test_max_events_exits_after_reconnect_and_counts_outcomes(pika, capsys):
+    FakeConnection.scripts = [
+        ([event("messages.upsert"), event("connection.update"), event("messages.upsert", "falha")], True),
+        ([event("messages.upsert"), event("messages.upsert"), event("messages.upsert")], False),
+    ]
+    consumer = threading.Thread(target=cli.events_consume, kwargs=dict(
+        queue_names=["q"], uri="amqp://", exchange=None, events="MESSAGES_UPSERT", handler=["falha"],
+        prefetch=10, ack_batch=1, ack_interval=0.0, workers=2, requeue_failed=False,
+        metrics_interval=3600.0, max_events=5
+    ), daemon=True)
+    consumer.start()
+    consumer.join(timeout=15)
+    assert not consumer.is_alive(), "events consume não terminou após a reconexão"
+
+    first, second = FakeConnection.opened
+    assert first._channel.nacks == [3]
+    assert max(first._channel.acks) == 2
+    assert max(second._channel.acks) == 2
+    assert second.bodies == [event("messages.upsert")]
+    summary = " ".join(capsys.readouterr().err.split())
+    assert "'received': 5, 'acked': 3, 'nacked': 1, 'filtered': 1, 'reconnects': 1" in summary
+
+
+@contextmanager
+def mock_sleep():
+    # Só o backoff da reconexão: não esperar segundos no teste
+    with mock.patch.object(cli.random, "uniform", lambda a, b: 0.0):
+        yield
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condição não atingida"
+        time.sleep(0.01)
+
+
+def test_handler_finishing_after_reconnect_does_not_ack_new_channel(pika, capsys):
+    SlowHandler.gates = {"antigo": threading.Event(), "novo": threading.Event()}
+    FakeConnection.scripts = [
+        ([event("messages.upsert", "antigo")], "early"),
+        ([event("messages.upsert", "novo"), event("messages.upsert")], False),
+    ]
+    consumer = threading.Thread(target=cli.events_consume, kwargs=dict(
+        queue_names=["q"], uri="amqp://", exchange=None, events=None, handler=["lento"],
+        prefetch=10, ack_batch=1, ack_interval=0.0, workers=3, requeue_failed=False,
+        metrics_interval=3600.0, max_events=3
+    ), daemon=True)
+    with mock_sleep():
+        consumer.start()
+        wait_for(lambda: len(FakeConnection.opened) == 2 and FakeConnection.opened[1].tag == 2)
+        second = FakeConnection.opened[1]
+        # O evento do canal antigo (tag 1 de lá) termina agora: não pode liberar a tag 1 do canal novo
+        SlowHandler.gates["antigo"].set()
+        time.sleep(0.3)
+        assert second._channel.acks == []
+        assert second._channel.nacks == []
+        SlowHandler.gates["novo"].set()
+        consumer.join(timeout=15)
+    assert not consumer.is_alive()
+    assert max(second._channel.acks) == 2
+    assert FakeConnection.opened[0]._channel.acks == []
+
+
+def test_ack_tracker_counts_only_handled_deliveries():
+    tracker = cli.AckTracker()
+    tracker.complete(2, "ok")
+    assert tracker.advance() is None
+    tracker.complete(1, "filtered")
+    tracker.complete(3, "failed")
+    tracker.complete(4, "ok")
+    assert tracker.advance() == 4
+    assert tracker.pending() == 3
+    assert tracker.acknowledge(4) == {"ok": 2, "filtered": 1}
+    assert tracker.advance() is None
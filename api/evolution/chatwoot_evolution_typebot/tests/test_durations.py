@@ -0,0 +1,29 @@
+import pytest
+
+import cli
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("90", 90.0),
+    ("45s", 45.0),
+    ("30m", 1800.0),
+    ("12h", 43200.0),
+    ("7d", 604800.0),
+    ("2w", 1209600.0),
+    ("1.5h", 5400.0),
+    (" 10M ", 600.0),
+])
+def test_parse_duration(value, seconds):
+    assert cli.parse_duration(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["", "m", "10x", "dez"])
+def test_parse_duration_rejects_garbage(value):
+    with pytest.raises(ValueError):
+        cli.parse_duration(value)
+
+
+def test_chat_timestamp_prefers_last_message():
+    assert cli.chat_timestamp({"lastMessage": {"messageTimestamp": 1700000000}, "updatedAt": "2020-01-01T00:00:00Z"}) == 1700000000
+    assert cli.chat_timestamp({"updatedAt": "1970-01-01T00:01:00Z"}) == 60
+    assert cli.chat_timestamp({"updatedAt": "ontem"}) == 0
@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+import cli
+
+
+class FakeWebSocket:
+    def __init__(self, frames):
+        self.frames = list(frames)
+        self.sent = []
+
+    def recv(self):
+        return self.frames.pop(0) if self.frames else ""
+
+    def send(self, frame):
+        self.sent.append(frame)
+
+
+def test_socketio_frames_are_decoded():
+    stream = cli.SocketIOStream("ws://x", "/a")
+    stream.ws = FakeWebSocket([
+        "2",
+        '42/a,["messages.upsert",{"data":{"key":{"id":"1"}}}]',
+        '4217["connection.update",{"state":"open"}]',
+        "41",
+    ])
+    events = stream.events()
+    assert next(events) == ("messages.upsert", {"data": {"key": {"id": "1"}}})
+    assert next(events) == ("connection.update", {"state": "open"})
+    assert stream.ws.sent == ["3"]
+    with pytest.raises(ConnectionError):
+        next(events)
+
+
+class ScriptedStream:
+    """Cada conexão entrega uma lista de eventos e depois cai."""
+
+    scripts = []
+
+    def __init__(self, url, namespace, apikey=""):
+        pass
+
+    def connect(self):
+        if not ScriptedStream.scripts:
+            raise KeyboardInterrupt
+        self.current = ScriptedStream.scripts.pop(0)
+
+    def events(self):
+        yield from self.current
+        raise ConnectionError("queda simulada")
+
+    def close(self):
+        pass
+
+
+def upsert(message_id, timestamp):
+    return ("messages.upsert", {"data": {"key": {"id": message_id}, "messageTimestamp": timestamp}})
+
+
+@pytest.fixture
+def tail(monkeypatch, tmp_path):
+    backfills = []
+    monkeypatch.setattr(cli, "SocketIOStream", ScriptedStream)
+    monkeypatch.setattr(cli.time, "sleep", lambda seconds: None)
+
+    def backfill(instance, since):
+        backfills.append(since)
+        return [{"key": {"id": "perdida"}, "messageTimestamp": since + 1}]
+
+    monkeypatch.setattr(cli, "backfill_messages", backfill)
+    out = tmp_path / "events.jsonl"
+
+    def run(scripts, **options):
+        ScriptedStream.scripts = [list(script) for script in scripts]
+        cli.events_tail(
+            instance="a", events=options.get("events"), handler=[f"ndjson:{out}"], url="ws://x",
+            workers=1, queue_size=10, backfill=True, max_events=None
+        )
+        return [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()], backfills
+
+    return run
+
+
+def test_reconnect_dedups_and_backfills(tail):
+    events, backfills = tail([[upsert("1", 100)], [upsert("1", 100), upsert("2", 101)]])
+    assert [event["data"]["key"]["id"] for event in events] == ["1", "perdida", "2"]
+    assert events[1]["backfill"] is True
+    assert backfills == [100]
+
+
+def test_backfill_respects_event_filter(tail):
+    update = ("messages.update", {"data": {"keyId": "1", "status": "READ", "messageTimestamp": 100}})
+    events, backfills = tail([[upsert("1", 100), update], [upsert("2", 101)]], events="MESSAGES_UPDATE")
+    assert [event["event"] for event in events] == ["messages.update"]
+    assert backfills == []
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+import cli
+
+pytest.importorskip("pyarrow")
+
+
+def messages(count, fail_after=None):
+    for i in range(count):
+        if fail_after is not None and i == fail_after:
+            raise ConnectionError("conexão caiu no meio da exportação")
+        yield {"key": {"id": f"M{i}", "remoteJid": "1@s.whatsapp.net", "fromMe": False}, "messageTimestamp": 100 + i}
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_failed_export_leaves_no_partial_file(monkeypatch, tmp_path, fmt):
+    monkeypatch.setattr(cli, "export_items", lambda kind, instance, since, page_size: messages(10, fail_after=6))
+    state = cli.ExportState(str(tmp_path / "state.json"))
+    with pytest.raises(ConnectionError):
+        cli.export_instance("messages", "a", str(tmp_path), fmt, state, False, 100, 2)
+    assert os.listdir(tmp_path / "messages" / "instance=a") == []
+    assert state.get("messages", "a") == {}
+
+
+def test_incremental_export_skips_rows_already_written(monkeypatch, tmp_path):
+    import pyarrow.parquet as pq
+
+    monkeypatch.setattr(cli, "export_items", lambda kind, instance, since, page_size: messages(5))
+    state = cli.ExportState(str(tmp_path / "state.json"))
+    first = cli.export_instance("messages", "a", str(tmp_path), "parquet", state, False, 100, 2)
+    assert first["rows"] == 5
+    assert pq.read_table(first["file"]).column("id").to_pylist() == ["M0", "M1", "M2", "M3", "M4"]
+    assert state.get("messages", "a") == {"timestamp": 104, "ids": ["M4"]}
+    assert cli.export_instance("messages", "a", str(tmp_path), "parquet", state, False, 100, 2)["rows"] == 0
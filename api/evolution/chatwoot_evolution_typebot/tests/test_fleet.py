@@ -0,0 +1,89 @@
+import pytest
+import requests
+
+import cli
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Evolution em memória: GETs devolvem o estado atual, POSTs para `failing` dão erro."""
+    state = {"posts": [], "puts": [], "failing": set(), "typebots": []}
+
+    def get(endpoint, params=None):
+        if endpoint == "/instance/fetchInstances":
+            return [{"name": "a"}]
+        if endpoint == "/proxy/find/a":
+            return {"enabled": True, "host": "proxy", "port": "3128", "protocol": "http"}
+        if endpoint == "/typebot/find/a":
+            return state["typebots"]
+        return {}
+
+    def post(endpoint, json=None, files=None):
+        state["posts"].append(endpoint)
+        if endpoint in state["failing"]:
+            raise requests.exceptions.HTTPError("500 Server Error")
+        return {}
+
+    def put(endpoint, json=None):
+        state["puts"].append((endpoint, json))
+        return {}
+
+    monkeypatch.setattr(cli.client, "get", get)
+    monkeypatch.setattr(cli.client, "post", post)
+    monkeypatch.setattr(cli.client, "put", put)
+    return state
+
+
+def write_spec(tmp_path, instance):
+    path = tmp_path / "fleet.json"
+    path.write_text(cli.json.dumps({"instances": [instance]}), encoding="utf-8")
+    return str(path)
+
+
+def test_numeric_proxy_port_matches_stored_string(api):
+    actions = cli.fleet_plan({"name": "a", "proxy": {"host": "proxy", "port": 3128}}, exists=True)
+    assert [(action["section"], action["action"]) for action in actions] == [("proxy", "ok")]
+    changed = cli.fleet_plan({"name": "a", "proxy": {"host": "proxy", "port": 8080}}, exists=True)[0]
+    assert changed["changes"] == ["port"]
+    assert changed["payload"]["port"] == "8080"
+
+
+def test_actions_after_a_failure_are_skipped(api, tmp_path, capsys):
+    api["failing"].add("/settings/set/a")
+    spec = {"name": "a", "settings": {"rejectCall": True}, "webhook": {"url": "http://hook"}, "proxy": {"host": "proxy", "port": 3128}}
+    cli.fleet_apply(write_spec(tmp_path, spec), plan=False, workers=1)
+    out = capsys.readouterr().out
+    assert api["posts"] == ["/settings/set/a"]
+    assert "skipped" in out
+    assert "0 alterações aplicadas, 1 com erro, 1 puladas, 1 sem mudança" in out
+
+
+def test_existing_typebot_is_reconciled(api, tmp_path, capsys):
+    api["typebots"] = [
+        {"id": "tb1", "url": "http://typebot", "typebot": "vendas", "expire": 20, "keywordFinish": "#FIM"},
+        {"id": "tb2", "url": "http://typebot", "typebot": "suporte", "expire": 60},
+    ]
+    spec = {"name": "a", "typebots": [
+        {"url": "http://typebot", "typebot": "vendas", "expire": 45},
+        {"url": "http://typebot", "typebot": "suporte", "expire": 60},
+        {"url": "http://typebot", "typebot": "novo"},
+    ]}
+    actions = {action["section"]: action for action in cli.fleet_plan(spec, exists=True)}
+    assert actions["typebot:vendas"]["action"] == "update"
+    assert actions["typebot:vendas"]["changes"] == ["expire"]
+    # O que não está no spec fica como está na API, não volta ao padrão
+    assert actions["typebot:vendas"]["payload"]["keywordFinish"] == "#FIM"
+    assert actions["typebot:suporte"]["action"] == "ok"
+    assert actions["typebot:novo"]["action"] == "create"
+
+    cli.fleet_apply(write_spec(tmp_path, spec), plan=False, workers=1)
+    assert [endpoint for endpoint, _ in api["puts"]] == ["/typebot/update/tb1/a"]
+    assert api["posts"] == ["/typebot/create/a"]
+
+
+def test_global_dry_run_only_plans(api, tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(cli.client, "dry_run", True)
+    spec = {"name": "a", "settings": {"rejectCall": True}}
+    cli.fleet_apply(write_spec(tmp_path, spec), plan=False, workers=1)
+    assert api["posts"] == []
+    assert "1 alterações planejadas" in capsys.readouterr().out
@@ -0,0 +1,124 @@
+import base64
+import json
+import os
+import threading
+
+import pytest
+import requests
+
+import cli
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    # Pedaços pequenos (múltiplo de 3) para exercitar as bordas sem arquivos grandes
+    monkeypatch.setattr(cli, "MEDIA_CHUNK", 12)
+
+
+def media_file(tmp_path, size, name="foto.jpg"):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+    return str(path)
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 11, 12, 13, 24, 100])
+def test_base64_body_matches_b64encode(tmp_path, size):
+    path = media_file(tmp_path, size)
+    body = cli.media_body({"number": "5511", "media": path, "caption": "olá"}, "media", path)
+    data = b"".join(body)
+    assert len(data) == len(body)
+    decoded = json.loads(data)
+    with open(path, "rb") as f:
+        assert decoded["media"] == base64.b64encode(f.read()).decode()
+    assert decoded["number"] == "5511" and decoded["caption"] == "olá"
+    assert body.content_type == "application/json"
+
+
+def test_multipart_body_carries_raw_file(tmp_path):
+    path = media_file(tmp_path, 50)
+    body = cli.media_body({"number": "5511", "media": path}, "media", path, "multipart")
+    # Como o socket: cada pedaço é consumido antes do próximo
+    data = b"".join(bytes(chunk) for chunk in body)
+    assert len(data) == len(body)
+    boundary = body.content_type.split("boundary=")[1].encode()
+    parts = data.split(b"--" + boundary)
+    file_part = next(part for part in parts if b'name="file"' in part)
+    with open(path, "rb") as f:
+        assert file_part.split(b"\r\n\r\n", 1)[1][:-2] == f.read()
+    assert b'filename="foto.jpg"' in file_part and b"Content-Type: image/jpeg" in file_part
+
+
+def test_concurrent_uploads_share_one_mapping(tmp_path):
+    path = media_file(tmp_path, 100)
+    first = iter(cli.media_body({"media": path}, "media", path))
+    second = iter(cli.media_body({"media": path}, "media", path))
+    # Prefixo e primeiro pedaço: os dois iteradores estão dentro do mmap
+    next(first), next(first)
+    next(second), next(second)
+    assert len(cli.media_mappings) == 1
+    entry = next(iter(cli.media_mappings._maps.values()))
+    assert entry[1] == 2
+    list(first)
+    assert len(cli.media_mappings) == 1 and entry[1] == 1
+    list(second)
+    assert len(cli.media_mappings) == 0
+
+
+def test_concurrent_threads_produce_identical_bodies(tmp_path):
+    path = media_file(tmp_path, 1000)
+    results = []
+
+    def upload():
+        results.append(b"".join(cli.media_body({"media": path}, "media", path)))
+
+    threads = [threading.Thread(target=upload) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 1
+    assert len(cli.media_mappings) == 0
+
+
+class ThrottlingSession:
+    """Consome o corpo inteiro a cada tentativa; a primeira recebe 429."""
+
+    def __init__(self):
+        self.bodies = []
+
+    def request(self, **kwargs):
+        self.bodies.append(b"".join(kwargs["data"]))
+        response = requests.Response()
+        response._content = b'{"ok": true}'
+        response._content_consumed = True
+        if len(self.bodies) == 1:
+            response.status_code = 429
+            response.headers["Retry-After"] = "0"
+        else:
+            response.status_code = 200
+        return response
+
+
+def test_body_is_streamed_again_after_429(tmp_path, monkeypatch):
+    path = media_file(tmp_path, 40)
+    api = cli.APIClient()
+    api.session = ThrottlingSession()
+    monkeypatch.setattr(cli.time, "sleep", lambda seconds: None)
+    body = cli.media_body({"number": "5511", "media": path}, "media", path)
+    assert api.post_stream("/message/sendMedia/a", body) == {"ok": True}
+    first, second = api.session.bodies
+    assert first == second and len(second) == len(body)
+    assert len(cli.media_mappings) == 0
+
+
+def test_post_media_streams_only_local_files(tmp_path, monkeypatch):
+    path = media_file(tmp_path, 10, "doc.pdf")
+    calls = []
+    monkeypatch.setattr(cli.client, "post", lambda endpoint, json=None: calls.append(("json", json)) or {})
+    monkeypatch.setattr(cli.client, "post_stream", lambda endpoint, body: calls.append(("stream", body)) or {})
+    cli.post_media("/message/sendMedia/a", {"media": "https://cdn/x.jpg", "mediatype": "image"}, "media")
+    cli.post_media("/message/sendMedia/a", {"media": f"file://{path}", "mediatype": "document"}, "media")
+    assert calls[0][0] == "json"
+    kind, body = calls[1]
+    assert kind == "stream" and body.path == path
+    assert json.loads(b"".join(body))["fileName"] == "doc.pdf"
@@ -0,0 +1,114 @@
+import json
+import threading
+import time
+import urllib.request
+
+import pytest
+import requests
+
+import cli
+
+
+class RecordingSession:
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def request(self, **kwargs):
+        with self._lock:
+            self.calls.append(kwargs)
+        response = requests.Response()
+        response.status_code = 201
+        response._content = json.dumps({"key": {"id": "X"}, "path": kwargs["url"]}).encode()
+        response.headers["Content-Type"] = "application/json"
+        return response
+
+
+@pytest.fixture
+def session(monkeypatch):
+    recording = RecordingSession()
+    monkeypatch.setattr(cli.client, "session", recording)
+    monkeypatch.setattr(cli.client, "priority", None)
+    monkeypatch.setattr(cli.client, "monitor", None)
+    return recording
+
+
+def test_bulk_priority_is_scoped_and_inherited(session):
+    with cli.client.default_priority("bulk"):
+        cli.run_bulk(range(3), lambda job: cli.client.post(f"/message/sendText/a", json={"number": str(job)}), 2)
+    cli.client.post("/message/sendText/a", json={"number": "9"})
+    priorities = [call["headers"].get("X-Priority") for call in session.calls]
+    assert priorities == ["bulk", "bulk", "bulk", None]
+
+
+def test_explicit_priority_wins_over_default(session, monkeypatch):
+    monkeypatch.setattr(cli.client, "priority", "high")
+    with cli.client.default_priority("bulk"):
+        cli.client.post("/message/sendText/a", json={"number": "1"})
+    assert session.calls[0]["headers"]["X-Priority"] == "high"
+
+
+def test_scheduler_serves_high_before_bulk():
+    scheduler = cli.OutboundScheduler(workers=4, reserved=1, recipient_interval=0)
+    for number in range(3):
+        scheduler.submit("a", "sendText", {"number": f"b{number}"}, "bulk")
+    scheduler.submit("a", "sendText", {"number": "h"}, "high")
+    assert scheduler.next_job().recipient == "h"
+
+
+@pytest.fixture
+def daemon(session):
+    scheduler = cli.OutboundScheduler(workers=2, reserved=1, recipient_interval=0)
+    server = cli.ThreadingHTTPServer(("127.0.0.1", 0), cli.OutboundHandler)
+    server.daemon_threads = True
+    server.scheduler = scheduler
+    threading.Thread(target=cli.outbound_worker, args=(scheduler,), daemon=True).start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    scheduler.close()
+    server.shutdown()
+    server.server_close()
+
+
+def call(url, method="GET", body=None, headers=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json", **(headers or {})})
+    with urllib.request.urlopen(request) as response:
+        return response.status, dict(response.headers), json.loads(response.read())
+
+
+def test_async_job_can_be_looked_up_and_uses_callers_apikey(daemon, session):
+    status, headers, body = call(
+        f"{daemon}/message/sendText/a", "POST", {"number": "1", "text": "oi"},
+        {"Prefer": "respond-async", "apikey": "chave-da-instancia"}
+    )
+    assert status == 202
+    assert headers["Location"] == body["location"] == f"/outbound/jobs/{body['id']}"
+    deadline = time.monotonic() + 5
+    while True:
+        _, _, job = call(daemon + body["location"])
+        if job["state"] == "sent" or time.monotonic() > deadline:
+            break
+        time.sleep(0.02)
+    assert job["state"] == "sent"
+    assert job["status"] == 201
+    assert job["response"]["key"] == {"id": "X"}
+    assert session.calls[-1]["headers"]["apikey"] == "chave-da-instancia"
+
+
+def test_forwarded_requests_use_callers_apikey(daemon, session):
+    call(f"{daemon}/instance/fetchInstances", headers={"apikey": "outra-chave"})
+    assert session.calls[-1]["headers"]["apikey"] == "outra-chave"
+    with pytest.raises(urllib.error.HTTPError) as error:
+        call(f"{daemon}/outbound/jobs/999")
+    assert error.value.code == 404
+
+
+@pytest.mark.parametrize("method, path", [("POST", "/message/sendText/a"), ("PUT", "/typebot/update/1/a")])
+def test_malformed_json_gets_400(daemon, session, method, path):
+    request = urllib.request.Request(f"{daemon}{path}", data=b"{nao e json", method=method, headers={"Content-Type": "application/json"})
+    with pytest.raises(urllib.error.HTTPError) as error:
+        urllib.request.urlopen(request)
+    assert error.value.code == 400
+    assert "JSON inválido" in json.loads(error.value.read())["error"]
+    assert session.calls == []
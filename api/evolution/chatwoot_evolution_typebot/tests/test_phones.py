@@ -0,0 +1,35 @@
+import pytest
+
+import cli
+
+
+@pytest.mark.parametrize("raw, country, expected", [
+    ("11987654321", "55", "5511987654321"),
+    ("011987654321", "55", "5511987654321"),
+    ("5511987654321", "55", "5511987654321"),
+    ("+5511987654321", "55", "5511987654321"),
+    ("551187654321", "55", "5511987654321"),
+    ("1187654321", "55", "5511987654321"),
+    # DDD 55 (RS) sem o código do país
+    ("55987654321", "55", "5555987654321"),
+    ("14155552671", "1", "14155552671"),
+    ("4155552671", "1", "14155552671"),
+    ("00447911123456", "1", "447911123456"),
+    ("07911123456", "44", "447911123456"),
+    ("447911123456", "44", "447911123456"),
+    ("3912345678", "39", "393912345678"),
+    ("89161234567", "7", "79161234567"),
+    ("123", "55", None),
+    ("+1234567890123456", "55", None),
+])
+def test_canonical_phone(raw, country, expected):
+    assert cli.canonical_phone(raw, country) == expected
+
+
+def test_iter_normalized_dedups_and_builds_jids():
+    stats = cli.NumberStats()
+    values = ["(11) 98765-4321", "+55 11 98765-4321", "abc", "5511987654321@s.whatsapp.net", "123@g.us", "123@G.US"]
+    result = list(cli.iter_normalized(values, "55", jid=True, stats=stats, chunk_size=2))
+    assert result == [(0, "5511987654321@s.whatsapp.net"), (4, "123@g.us")]
+    assert stats.duplicates == 3
+    assert stats.invalid == ["abc"]
@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+import requests
+
+import cli
+
+
+@pytest.fixture
+def pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(cli.client, "monitor", None)
+    instance_pool = cli.InstancePool({"a": 1.0, "b": 1.0}, path=str(tmp_path / "pool.db"), cooldown=60)
+    yield instance_pool
+    instance_pool.db.close()
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(f"{status}", response=response)
+
+
+def pinned(pool):
+    with sqlite3.connect(pool.db.execute("PRAGMA database_list").fetchone()[2]) as db:
+        return dict(db.execute("SELECT recipient, instance FROM sticky"))
+
+
+def test_recipient_sticks_to_first_instance(pool):
+    first = pool.acquire("5511")
+    pool.release(first)
+    pool.acquire("5522")
+    assert pool.acquire("5511") == first
+
+
+def test_pins_are_written_in_batches(pool, monkeypatch):
+    monkeypatch.setattr(pool, "PIN_BATCH", 3)
+    for number in ("1", "2"):
+        pool.release(pool.acquire(number))
+    assert pinned(pool) == {}
+    pool.release(pool.acquire("3"))
+    assert set(pinned(pool)) == {"1", "2", "3"}
+    pool.release(pool.acquire("4"))
+    pool.flush()
+    assert set(pinned(pool)) == {"1", "2", "3", "4"}
+
+
+def test_client_errors_do_not_take_instance_out(pool):
+    for _ in range(cli.InstancePool.FAILURE_WINDOW):
+        pool.release(pool.acquire("5511"), http_error(400))
+    assert pool.healthy("a") and pool.healthy("b")
+    assert sum(counts["failed"] for counts in pool.counts.values()) == cli.InstancePool.FAILURE_WINDOW
+
+
+@pytest.mark.parametrize("error", [http_error(502), requests.exceptions.ConnectionError("reset"), requests.exceptions.ReadTimeout("slow")])
+def test_transport_and_server_errors_trigger_cooldown(pool, error):
+    name = pool.acquire("5511")
+    for _ in range(cli.InstancePool.FAILURE_WINDOW // 2):
+        pool.release(name, error)
+        pool.outstanding[name] += 1
+    assert not pool.healthy(name)
+
+
+def test_lease_classifies_raised_errors(pool):
+    with pytest.raises(requests.exceptions.HTTPError):
+        with pool.lease("5511") as name:
+            raise http_error(404)
+    assert list(pool._outcomes[name]) == [True]
+    assert pool.counts[name]["failed"] == 1
+    assert pool.outstanding[name] == 0
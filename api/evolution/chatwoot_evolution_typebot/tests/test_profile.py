@@ -0,0 +1,34 @@
+import pstats
+import threading
+
+import cli
+
+
+def busy():
+    return sum(i * i for i in range(20000))
+
+
+def test_nested_session_joins_outer_profile(tmp_path):
+    outer, inner = tmp_path / "outer.txt", tmp_path / "inner.txt"
+    with cli.profile_session("cpu", str(outer)):
+        # Como o 'batch run': o comando aninhado roda numa thread de trabalho
+        def nested():
+            with cli.profile_session("alloc", str(inner)):
+                busy()
+        thread = threading.Thread(target=nested)
+        thread.start()
+        thread.join()
+    assert outer.exists()
+    assert not inner.exists()
+    assert not cli.profile_lock.locked()
+
+
+def test_calls_mode_profiles_main_thread(tmp_path):
+    path = tmp_path / "calls.prof"
+    with cli.profile_session("calls", str(path)):
+        busy()
+    names = {name for _, _, name in pstats.Stats(str(path)).stats}
+    assert "busy" in names
+    with cli.profile_session("calls", str(path)):
+        pass
+    assert not cli.profile_lock.locked()
@@ -0,0 +1,118 @@
+import json
+
+import pytest
+import requests
+
+import cli
+
+
+@pytest.fixture
+def cache(tmp_path):
+    profile_cache = cli.ProfileCache(str(tmp_path / "profiles"))
+    yield profile_cache
+    profile_cache.close()
+
+
+def test_pictures_are_stored_once_per_hash(cache):
+    digest, created = cache.store_picture(b"jpeg")
+    assert created
+    assert cache.store_picture(b"jpeg") == (digest, False)
+    with open(cache.picture_path(digest), "rb") as f:
+        assert f.read() == b"jpeg"
+    assert cache.store_picture(b"outra")[0] != digest
+
+
+def test_put_reports_only_content_changes(cache):
+    assert cache.put("5511", "profile", {"name": "Ana"})
+    assert not cache.put("5511", "profile", {"name": "Ana"})
+    assert cache.put("5511", "profile", {"name": "Ana Maria"})
+    # Com identity, só ela decide: a URL assinada pode mudar à vontade
+    assert cache.put("5511", "picture", {"url": "u1", "sha256": "x"}, {"sha256": "x"})
+    assert not cache.put("5511", "picture", {"url": "u2", "sha256": "x"}, {"sha256": "x"})
+    assert cache.field("5511", "picture")["url"] == "u2"
+    assert set(cache.fetched_at("5511")) == {"profile", "picture"}
+
+
+class ProfileSession:
+    """API falsa: fetchProfilePictureUrl devolve `picture_url`; o CDN responde com ETag e 304."""
+
+    def __init__(self):
+        self.picture_url = "https://cdn.example/v/1.jpg?sig=a"
+        self.calls = []
+
+    def request(self, **kwargs):
+        self.calls.append(kwargs)
+        response = requests.Response()
+        response.status_code = 200
+        response._content_consumed = True
+        if kwargs["url"].startswith("https://cdn.example/"):
+            if kwargs["headers"].get("If-None-Match") == '"v1"':
+                response.status_code = 304
+                response._content = b""
+            else:
+                response._content = b"jpeg-bytes"
+                response.headers["ETag"] = '"v1"'
+        else:
+            response._content = json.dumps({"profilePictureUrl": self.picture_url}).encode()
+        return response
+
+    def cdn_calls(self):
+        return [call for call in self.calls if call["url"].startswith("https://cdn.example/")]
+
+
+def enrich(tmp_path, **overrides):
+    options = dict(
+        instance="a", numbers="5511999990000", file=None, fields="picture", ttl_picture="1h", ttl_profile="30d",
+        ttl_business="30d", download=True, force=False, out=None, workers=2, cache_dir=str(tmp_path / "profiles")
+    )
+    options.update(overrides)
+    cli.profile_enrich(**options)
+
+
+@pytest.fixture
+def session(monkeypatch):
+    fake = ProfileSession()
+    monkeypatch.setattr(cli.client, "session", fake)
+    monkeypatch.setattr(cli.client, "monitor", None)
+    monkeypatch.setattr(cli.client, "apikey", "segredo")
+    monkeypatch.setattr(cli, "display_response", lambda data, title="": None)
+    return fake
+
+
+def test_enrich_respects_ttl_and_refreshes_conditionally(tmp_path, session):
+    enrich(tmp_path)
+    assert len(session.calls) == 2
+    assert "apikey" not in session.cdn_calls()[0]["headers"]
+
+    # Dentro do TTL: nenhuma consulta
+    enrich(tmp_path)
+    assert len(session.calls) == 2
+
+    # Foto com outro caminho: GET condicional, o 304 reaproveita os bytes
+    session.picture_url = "https://cdn.example/v/2.jpg?sig=b"
+    enrich(tmp_path, force=True, out=str(tmp_path / "out.jsonl"))
+    cdn = session.cdn_calls()
+    assert len(cdn) == 2 and cdn[1]["headers"]["If-None-Match"] == '"v1"'
+    with open(tmp_path / "out.jsonl", encoding="utf-8") as f:
+        picture = json.loads(f.readline())["picture"]
+    assert picture["version"] == "/v/2.jpg" and picture["etag"] == '"v1"'
+    with open(picture["path"], "rb") as f:
+        assert f.read() == b"jpeg-bytes"
+
+
+def test_enrich_closes_cache_when_the_run_fails(tmp_path, session, monkeypatch):
+    closed = []
+
+    class Cache(cli.ProfileCache):
+        def close(self):
+            closed.append(True)
+            super().close()
+
+    def explode(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(cli, "ProfileCache", Cache)
+    monkeypatch.setattr(cli, "run_bulk", explode)
+    with pytest.raises(RuntimeError):
+        enrich(tmp_path)
+    assert closed == [True]
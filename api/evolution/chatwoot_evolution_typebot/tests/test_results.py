@@ -0,0 +1,145 @@
+import json
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import cli
+
+
+@pytest.fixture
+def store(tmp_path):
+    result_store = cli.ResultStore(str(tmp_path / "results.db"))
+    result_store.register_poll("a", "M1", "Sabor?", ["Uva", "Limão"], poll="sabor")
+    yield result_store
+    result_store.close()
+
+
+def tally(store):
+    meta, options = store.poll_result("sabor")
+    return meta["voters"], dict(options)
+
+
+def test_vote_counts_latest_choice_per_voter(store):
+    assert store.vote("a", "M1", "v1", ["Uva"], 10.0)
+    assert store.vote("a", "M1", "v2", ["Uva"], 10.0)
+    assert tally(store) == (2, {"Uva": 2, "Limão": 0})
+    # Troca de voto ajusta só a diferença
+    assert store.vote("a", "M1", "v1", ["Limão"], 11.0)
+    assert tally(store) == (2, {"Uva": 1, "Limão": 1})
+
+
+def test_vote_ignores_repeats_and_stale_updates(store):
+    store.vote("a", "M1", "v1", ["Uva"], 10.0)
+    assert not store.vote("a", "M1", "v1", ["Uva"], 12.0)
+    assert not store.vote("a", "M1", "v1", ["Limão"], 5.0)
+    assert tally(store) == (1, {"Uva": 1, "Limão": 0})
+
+
+def test_vote_retraction_and_unknown_poll(store):
+    store.vote("a", "M1", "v1", ["Uva"], 10.0)
+    assert store.vote("a", "M1", "v1", [], 11.0)
+    assert tally(store) == (0, {"Uva": 0, "Limão": 0})
+    assert store.vote("a", "OUTRA", "v1", ["Sim"], 10.0)
+    assert store.resolve_poll("OUTRA") == "OUTRA"
+
+
+def test_sync_fetches_every_poll_creation_type(tmp_path, monkeypatch):
+    types = []
+
+    def post(endpoint, json=None):
+        types.append(json["where"]["messageType"])
+        return {"messages": {"records": [], "pages": 1}}
+
+    monkeypatch.setattr(cli.client, "post", post)
+    monkeypatch.setattr(cli, "display_response", lambda data, title="": None)
+    cli.results_sync(instance="a", remote_jid=None, since=None, status=False, db=str(tmp_path / "r.db"))
+    assert types == [*cli.POLL_CREATION_TYPES, "pollUpdateMessage"]
+
+
+def test_send_template_closes_store_when_sending_fails(tmp_path, monkeypatch):
+    closed = []
+
+    class Store(cli.ResultStore):
+        def close(self):
+            closed.append(True)
+            super().close()
+
+    def explode(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    recipients = tmp_path / "r.jsonl"
+    recipients.write_text('{"number": "5511999990000"}\n')
+    monkeypatch.setattr(cli, "ResultStore", lambda: Store(str(tmp_path / "results.db")))
+    monkeypatch.setattr(cli, "run_bulk", explode)
+    with pytest.raises(RuntimeError):
+        cli.broadcast_send_template(
+            instance="a", recipients=str(recipients), kind="poll", text=None, url=None, mediatype="image",
+            caption=None, upload="base64", name="Sabor?", values="Uva,Limão", selectable_count=1, title=None,
+            description=None, button_text=None, sections=None, number_column="number", delay=None, workers=1,
+            show_responses=False, pool=None, poll_key=None
+        )
+    assert closed == [True]
+
+
+class NullPipeline:
+    def submit(self, event):
+        pass
+
+
+def test_webhook_counts_are_consistent_under_concurrency():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), cli.EventWebhookHandler)
+    server.daemon_threads = True
+    server.pipeline = NullPipeline()
+    server.wanted = {"messages.upsert"}
+    server.counts = {"received": 0, "filtered": 0}
+    server.counts_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    def post(name):
+        for _ in range(20):
+            body = json.dumps({"event": name, "data": {}}).encode()
+            urllib.request.urlopen(urllib.request.Request(url, data=body, method="POST")).read()
+
+    threads = [threading.Thread(target=post, args=(name,)) for name in ("messages.upsert", "presence.update") * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+    server.server_close()
+    assert server.counts == {"received": 80, "filtered": 80}
+
+
+class LockedStore:
+    closed = []
+
+    def __init__(self, *args):
+        pass
+
+    def register_status(self, *args):
+        raise cli.sqlite3.OperationalError("database is locked")
+
+    def register_poll(self, *args):
+        raise cli.sqlite3.OperationalError("database is locked")
+
+    def close(self):
+        LockedStore.closed.append(True)
+
+
+@pytest.mark.parametrize("command, kwargs, title", [
+    (cli.message_send_status, dict(instance="a", type="text", content="oi", all_contacts=True, status_jid=None), "Status Enviado"),
+    (cli.message_send_poll, dict(instance="a", number="5511", name="Sabor?", values="Uva,Limão", selectable_count=1, delay=None, poll_key=None), "Enquete Enviada"),
+])
+def test_bookkeeping_failure_does_not_hide_successful_send(monkeypatch, capsys, command, kwargs, title):
+    shown = []
+    LockedStore.closed = []
+    monkeypatch.setattr(cli, "ResultStore", LockedStore)
+    monkeypatch.setattr(cli.client, "post", lambda endpoint, json=None: {"key": {"id": "M1"}})
+    monkeypatch.setattr(cli, "display_response", lambda data, title="": shown.append(title))
+    command(**kwargs)
+    assert shown == [title]
+    assert LockedStore.closed == [True]
+    assert "database is locked" in capsys.readouterr().out
@@ -0,0 +1,83 @@
+import pytest
+
+import cli
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(cli.time, "monotonic", fake)
+    return fake
+
+
+def incoming(conversation_id=7, **conversation):
+    return {
+        "event": "message_created", "message_type": "incoming", "content": "oi",
+        "inbox": {"name": "loja"}, "sender": {"identifier": "5511@s.whatsapp.net"},
+        "conversation": {"id": conversation_id, "status": "open", **conversation},
+    }
+
+
+def agent_reply(conversation_id=7, private=False):
+    return {
+        "event": "message_created", "message_type": "outgoing", "private": private,
+        "sender": {"type": "user"}, "inbox": {"name": "loja"}, "conversation": {"id": conversation_id},
+    }
+
+
+def test_ttl_cache_expires_and_evicts_least_recent(clock):
+    cache = cli.TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.stats["evicted"] == 1
+    clock.now += 11
+    assert cache.get("a") is None
+    assert cache.stats["expired"] == 1 and len(cache) == 1
+
+
+def test_agent_reply_takes_conversation_from_typebot(clock):
+    router = cli.ConversationRouter()
+    state = router.observe_chatwoot(incoming())
+    assert (state.instance, state.remote_jid) == ("loja", "5511@s.whatsapp.net")
+    assert router.wants_typebot(state)
+    # Nota privada não conta como resposta
+    assert router.wants_typebot(router.observe_chatwoot(agent_reply(private=True)))
+    assert not router.wants_typebot(router.observe_chatwoot(agent_reply()))
+    assert not router.wants_typebot(router.observe_chatwoot(incoming()))
+
+
+def test_assignment_and_resolution(clock):
+    router = cli.ConversationRouter()
+    router.observe_chatwoot(incoming())
+    assigned = {"event": "conversation_updated", "id": 7, "status": "open", "meta": {"assignee": {"id": 3}}}
+    assert not router.wants_typebot(router.observe_chatwoot(assigned))
+    resolved = {"event": "conversation_status_changed", "id": 7, "status": "resolved", "meta": {}}
+    assert router.wants_typebot(router.observe_chatwoot(resolved))
+
+
+def test_paused_typebot_session_seen_before_conversation(clock):
+    router = cli.ConversationRouter()
+    router.observe_evolution({"event": "TYPEBOT_CHANGE_STATUS", "instance": "loja", "data": {"remoteJid": "5511@s.whatsapp.net", "status": "paused"}})
+    assert not router.wants_typebot(router.observe_chatwoot(incoming()))
+
+
+def test_expired_conversation_falls_back_to_typebot(clock):
+    router = cli.ConversationRouter(ttl=60)
+    router.observe_chatwoot(incoming())
+    router.observe_chatwoot(agent_reply())
+    assert not router.wants_typebot(router.conversations.get(7))
+    clock.now += 61
+    assert router.conversations.get(7) is None
+    # Como no middleware.js: sem estado conhecido, a mensagem segue para o Typebot
+    assert router.wants_typebot(router.conversations.get(7))
+    assert router.wants_typebot(router.observe_chatwoot(incoming()))
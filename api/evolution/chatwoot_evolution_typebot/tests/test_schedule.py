@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+import cli
+
+
+@pytest.fixture
+def store(tmp_path):
+    schedule = cli.ScheduleStore(str(tmp_path / "schedule.db"))
+    yield schedule
+    schedule.close()
+
+
+def add(store, count, due_at=0.0):
+    return store.add_many(("a", "sendText", {"number": str(i), "text": "oi"}, due_at + i) for i in range(count))
+
+
+def test_claim_due_in_order_and_finish(store):
+    add(store, 3)
+    store.add_many([("a", "sendText", {"number": "9", "text": "depois"}, time.time() + 3600)])
+    assert store.acquire_lease("w1")
+    jobs = store.claim_due(time.time(), 2)
+    assert [job[3]["number"] for job in jobs] == ["0", "1"]
+    assert store.finish("w1", [(jobs[0][0], "sent", None), (jobs[1][0], "failed", "500")])
+    assert store.counts() == {"sent": 1, "failed": 1, "pending": 2}
+    assert store.next_due() == 2.0
+
+
+def test_takeover_recovers_in_flight_and_rejects_old_owner(store, monkeypatch):
+    add(store, 2)
+    monkeypatch.setattr(store, "LEASE_SECONDS", -1.0)
+    assert store.acquire_lease("w1")
+    jobs = store.claim_due(time.time(), 10)
+    # Lease vencido: outro despachante assume e marca os envios em andamento
+    assert store.acquire_lease("w2")
+    assert store.recover() == 2
+    assert not store.finish("w1", [(job[0], "sent", None) for job in jobs])
+    assert store.counts() == {"unknown": 2}
+    assert store.requeue(["unknown"]) == 2
+
+
+def test_lease_is_exclusive_until_released(store):
+    assert store.acquire_lease("w1")
+    assert not store.acquire_lease("w2")
+    assert store.acquire_lease("w1")
+    store.release_lease("w1")
+    assert store.acquire_lease("w2")
+
+
+class SlowSession:
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def request(self, **kwargs):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls += 1
+        response = requests.Response()
+        response.status_code = 201
+        response._content = json.dumps({"key": {"id": "X"}}).encode()
+        return response
+
+
+def test_run_renews_lease_during_a_long_batch(tmp_path, monkeypatch):
+    path = str(tmp_path / "schedule.db")
+    store = cli.ScheduleStore(path)
+    add(store, 4)
+    store.close()
+    monkeypatch.setattr(cli.ScheduleStore, "LEASE_SECONDS", 0.3)
+    monkeypatch.setattr(cli.client, "session", SlowSession(0.25))
+    monkeypatch.setattr(cli.client, "monitor", None)
+    rival = cli.ScheduleStore(path)
+    takeovers = []
+
+    def compete():
+        # Tenta assumir enquanto o lote (4 x 0,25s, um worker) ainda está enviando
+        for _ in range(8):
+            time.sleep(0.1)
+            takeovers.append(rival.acquire_lease("rival"))
+
+    competitor = threading.Thread(target=compete)
+    competitor.start()
+    cli.schedule_run(batch=500, workers=1, poll=0.1, once=True, db=path)
+    competitor.join()
+    rival.close()
+    assert not any(takeovers)
+    check = cli.ScheduleStore(path)
+    assert check.counts() == {"sent": 4}
+    check.close()
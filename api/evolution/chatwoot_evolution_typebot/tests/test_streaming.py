@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+import cli
+
+
+def chunked(text, size):
+    data = text.encode("utf-8")
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 4096])
+def test_array_items_across_chunk_boundaries(size):
+    items = [{"id": i, "nome": "Jõão ✓", "tags": ["a", "b"]} for i in range(50)]
+    assert list(cli.iter_json_array(chunked(json.dumps(items), size))) == items
+
+
+def test_array_under_key_keeps_prefix():
+    body = '{"messages": {"total": 2, "pages": 1, "records": [{"id": "a"}, {"id": "b"}]}}'
+    meta = {}
+    assert list(cli.iter_json_array(chunked(body, 5), key="records", meta=meta)) == [{"id": "a"}, {"id": "b"}]
+    assert '"total": 2' in meta["prefix"]
+
+
+def test_non_array_body_is_a_single_item():
+    assert list(cli.iter_json_array([b'{"error": "x"}'])) == [{"error": "x"}]
+    assert list(cli.iter_json_array([b"[]"])) == []
+
+
+def test_truncated_array_raises():
+    with pytest.raises(ValueError):
+        list(cli.iter_json_array([b'[{"id": 1}, {"id": ']))
@@ -0,0 +1,25 @@
+import cli
+
+
+def test_fields_and_defaults():
+    template = cli.MessageTemplate("Olá {{ nome | cliente }}, pedido {{pedido}}")
+    assert template.fields == ["nome", "pedido"]
+    assert template.render({"nome": "Ana", "pedido": 7}) == "Olá Ana, pedido 7"
+    assert template.render({"pedido": 7}) == "Olá cliente, pedido 7"
+    assert template.render({"nome": None, "pedido": 7}) == "Olá cliente, pedido 7"
+
+
+def test_falsy_values_are_kept():
+    template = cli.MessageTemplate("{{saldo|?}} {{ativo|?}} [{{obs|?}}]")
+    assert template.render({"saldo": 0, "ativo": False, "obs": ""}) == "0 False []"
+
+
+def test_dotted_fields_read_nested_values():
+    template = cli.MessageTemplate("{{cliente.nome|?}} {{a.b}}")
+    assert template.render({"cliente": {"nome": "Ana"}, "a.b": "coluna"}) == "Ana coluna"
+    assert template.render({"cliente": "texto"}) == "? "
+
+
+def test_literal_braces_survive():
+    assert cli.MessageTemplate("{x} {{n}}").render({"n": 1}) == "{x} 1"
+    assert cli.MessageTemplate("sem campos {}").render({}) == "sem campos {}"
@@ -0,0 +1,84 @@
+import io
+import json
+import threading
+
+import pytest
+from rich.console import Console
+
+import cli
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    instance = cli.Tracer()
+    path = tmp_path / "trace.jsonl"
+    instance.start(str(path))
+    yield instance, path
+    instance.stop()
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return {record["name"]: record for record in map(json.loads, f)}
+
+
+def test_spans_nest_per_thread(tracer):
+    instance, path = tracer
+    with instance.span("cli.send"):
+        outer = instance.current()
+        with instance.span("payload", size=3) as attributes:
+            attributes["bytes"] = 10
+
+        def worker():
+            # Outra thread não herda a pilha: o pai vem explícito
+            assert instance.current() is None
+            with instance.span("http", parent_id=outer):
+                pass
+
+        thread = threading.Thread(target=worker, name="bulk-0")
+        thread.start()
+        thread.join()
+    assert instance.current() is None
+    instance.stop()
+    spans = read(path)
+    assert spans["cli.send"]["parent_id"] is None
+    assert spans["payload"]["parent_id"] == spans["cli.send"]["span_id"] == outer
+    assert spans["payload"]["attributes"] == {"size": 3, "bytes": 10}
+    assert spans["http"]["parent_id"] == outer and spans["http"]["thread"] == "bulk-0"
+    assert {record["trace_id"] for record in spans.values()} == {instance.trace_id}
+
+
+def test_failed_span_records_error_and_unwinds(tracer):
+    instance, path = tracer
+    with pytest.raises(ValueError):
+        with instance.span("cli.fail"):
+            raise ValueError("ruim")
+    assert instance.current() is None
+    instance.stop()
+    record = read(path)["cli.fail"]
+    assert record["status"] == "error" and "ruim" in record["attributes"]["error"]
+
+
+def test_disabled_tracer_writes_nothing():
+    instance = cli.Tracer()
+    with instance.span("x", a=1) as attributes:
+        assert attributes == {"a": 1}
+        assert instance.current() is None
+
+
+def test_summarize_totals_self_time_and_p95(tmp_path, monkeypatch):
+    path = tmp_path / "trace.jsonl"
+    records = [{"span_id": "root", "parent_id": None, "name": "cli.send", "duration_ms": 6000.0, "status": "ok"}]
+    for i in range(1, 101):
+        records.append({
+            "span_id": f"h{i}", "parent_id": "root", "name": "http", "duration_ms": float(i),
+            "status": "error" if i % 50 == 0 else "ok"
+        })
+    path.write_text("\n".join(json.dumps(record) for record in records) + "\n", encoding="utf-8")
+    output = io.StringIO()
+    monkeypatch.setattr(cli, "console", Console(file=output, width=200))
+    cli.trace_summarize(str(path), min_percent=0.0)
+    rows = {line.split("│")[1].strip(): [cell.strip() for cell in line.split("│")[2:-1]] for line in output.getvalue().splitlines() if line.count("│") > 5}
+    # Qtd, Total, Próprio, Média, P95, Erros, %
+    assert rows["cli.send"][:6] == ["1", "6000.0", "950.0", "6000.00", "6000.00", "0"]
+    assert rows["http"][:6] == ["100", "5050.0", "5050.0", "50.50", "95.00", "2"]